@@ -1,29 +1,72 @@
 import datetime
+import os
+import shutil
 Import("env")
 
 # 1. Generate the realtime date
 # Format: 20260129-1606
-build_date = datetime.datetime.now().strftime("%Y%m%d-%H%M")
+# This script runs as both pre: and post: extra_script; the first run stores
+# the date in the process environment so both sides agree even if the minute
+# ticks over in between.
+build_date = os.environ.get("SLB_BUILD_DATE") or datetime.datetime.now().strftime("%Y%m%d-%H%M")
+os.environ["SLB_BUILD_DATE"] = build_date
 
-# 2. Get the variables from platformio.ini and the Environment
-custom_ver = env.GetProjectOption("custom_prog_version")  # e.g., SLB_EXT
-variant_name = env["PIOENV"]                              # e.g., altmill_mk2_4x4_atc...
+# pre: and post: share one SCons env, so the first run caches the resolved
+# name on it and the second run has nothing left to do (this also keeps the
+# HEX post-action from being registered twice)
+if "SLB_PROGNAME" not in env:
+    # 2. Get the variables from platformio.ini and the Environment
+    custom_ver = env.GetProjectOption("custom_prog_version")  # e.g., SLB_EXT
+    variant_name = env["PIOENV"]                              # e.g., altmill_mk2_4x4_atc...
 
-# 3. Construct the new program name
-# Format: SLB_EXT_<VARIANT_NAME>_<DATE>
-# Example: SLB_EXT_altmill_mk2_4x4_atc_firmware..._20260129-1606
-new_prog_name = "%s_%s_%s" % (custom_ver, variant_name, build_date)
+    # 3. Construct the new program name
+    # Format: SLB_EXT_<VARIANT_NAME>_<DATE>
+    # Example: SLB_EXT_altmill_mk2_4x4_atc_firmware..._20260129-1606
+    new_prog_name = "%s_%s_%s" % (custom_ver, variant_name, build_date)
 
-# 4. Apply the new name to the environment
-print(f"Renaming output firmware to: {new_prog_name}")
-env.Replace(PROGNAME=new_prog_name)
-env.Replace(custom_board_name=new_prog_name)
+    # 4. Apply the new name to the environment
+    print(f"Renaming output firmware to: {new_prog_name}")
+    env.Replace(PROGNAME=new_prog_name)
+    env.Replace(custom_board_name=new_prog_name)
+    env.Replace(SLB_PROGNAME=new_prog_name)
 
-# 5. Custom HEX from ELF
-env.AddPostAction(
-    "$BUILD_DIR/${PROGNAME}.elf",
-    env.VerboseAction(" ".join([
-        "$OBJCOPY", "-O", "ihex", "-R", ".eeprom",
-        '"$BUILD_DIR/${PROGNAME}.elf"', '"$BUILD_DIR/${PROGNAME}.hex"'
-    ]), "Building $BUILD_DIR/${PROGNAME}.hex")
-)
+    # 5. Custom HEX from ELF (${PROGNAME} is expanded by SCons when the action runs)
+    env.AddPostAction(
+        "$BUILD_DIR/${PROGNAME}.elf",
+        env.VerboseAction(
+            '$OBJCOPY -O ihex -R .eeprom "$BUILD_DIR/${PROGNAME}.elf" "$BUILD_DIR/${PROGNAME}.hex"',
+            "Building $BUILD_DIR/${PROGNAME}.hex"
+        )
+    )
+
+# 6. Compiler cache / distributed compilation
+# The platform builder only sets CC/CXX to the ARM toolchain after pre:
+# scripts have run, so this takes effect on the post: pass; the prefix check
+# also keeps the compilers from being wrapped twice.
+# $BUILD_SCRIPT has already cloned env for the project sources (projenv) and
+# for every library builder, and those clones do the actual compiling, so
+# each of them needs the wrapper too.
+if env.subst("$CC").startswith("arm-none-eabi"):
+    wrappers = []
+    wrapper_env = {}
+    if shutil.which("ccache"):
+        wrappers.append("ccache")
+    if os.environ.get("DISTCC_HOSTS") and shutil.which("distcc"):
+        if wrappers:
+            # ccache hands its cache misses to distcc
+            wrapper_env["CCACHE_PREFIX"] = "distcc"
+        else:
+            wrappers.append("distcc")
+    if wrappers:
+        prefix = " ".join(wrappers) + " "
+        try:
+            Import("projenv")
+        except Exception:
+            projenv = None
+        build_envs = [env, projenv] + [lb.env for lb in env.GetLibBuilders()]
+        for build_env in {id(e): e for e in build_envs if e is not None}.values():
+            if build_env.subst("$CC").startswith("arm-none-eabi"):
+                build_env.Replace(CC=prefix + build_env.subst("$CC"),
+                                  CXX=prefix + build_env.subst("$CXX"))
+                # Each clone carries its own copy of the process environment
+                build_env["ENV"].update(wrapper_env)
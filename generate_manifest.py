@@ -2,6 +2,14 @@ import os
 import json
 import datetime
 
+try:
+    import orjson
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=4)
+
 # Configuration
 OUTPUT_DIR = "public/firmware"
 MANIFEST_FILE = "public/firmware_manifest.json"
@@ -14,29 +22,42 @@ def generate_manifest():
         print(f"Directory {OUTPUT_DIR} does not exist.")
         return
 
-    for filename in os.listdir(OUTPUT_DIR):
-        if filename.endswith(".bin") or filename.endswith(".hex"):
+    # Adding or removing firmware bumps the directory mtime; if the manifest
+    # was written after that there is nothing new to list
+    if os.path.exists(MANIFEST_FILE) and os.stat(MANIFEST_FILE).st_mtime >= os.stat(OUTPUT_DIR).st_mtime:
+        print("Manifest up to date.")
+        return
+
+    now = datetime.datetime.now().isoformat()
+
+    with os.scandir(OUTPUT_DIR) as entries:
+        for entry in entries:
+            filename = entry.name
+            if not (filename.endswith((".bin", ".hex")) and entry.is_file()):
+                continue
             # Parse info from filename if using the naming convention
             # Ex: SLB_EXT_altmill_mk2_4x4_atc_20260129-1606.bin
 
             file_path = os.path.join("firmware", filename) # Web path relative to root
+            stat = entry.stat()
 
             file_entry = {
                 "name": filename,
                 "path": file_path,
-                "size": os.path.getsize(os.path.join(OUTPUT_DIR, filename)),
-                "date": datetime.datetime.now().isoformat(),
+                "size": stat.st_size,
+                # The file's own mtime, so each build shows when it was produced
+                "date": datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
                 "type": "binary" if filename.endswith(".bin") else "hex"
             }
             files.append(file_entry)
 
     manifest = {
-        "generated_at": datetime.datetime.now().isoformat(),
+        "generated_at": now,
         "files": files
     }
 
-    with open(MANIFEST_FILE, "w") as f:
-        json.dump(manifest, f, indent=4)
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        f.write(_dumps(manifest))
 
     print(f"Manifest generated with {len(files)} entries.")
 
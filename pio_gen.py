@@ -0,0 +1,485 @@
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import filecmp
+import functools
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+import string
+import time
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+HTTP_TIMEOUT = 10
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.3
+
+# Downloaded profiles are cached here together with their ETag/Last-Modified
+# validators; within PROFILE_CACHE_TTL seconds the network is skipped entirely
+# (CI sets it to 0 so a restored cache is always revalidated)
+PROFILE_CACHE_DIR = Path(".cache/profiles")
+PROFILE_CACHE_TTL = int(os.environ.get("PROFILE_CACHE_TTL", 3600))
+
+STATIC_HEADER = """
+[platformio]
+default_envs = {default_envs}
+include_dir = Inc
+src_dir = Src
+
+[common]
+build_flags =
+  -I .
+  -I boards
+  -I FatFs
+  -I FatFs/STM
+  -I Drivers/FATFS/Target
+  -I Middlewares/ST/STM32_USB_Device_Library/Class/CDC/Inc
+  -I Middlewares/ST/STM32_USB_Device_Library/Core/Inc
+  -I USB_DEVICE/App
+  -I USB_DEVICE/Target
+  -D OVERRIDE_MY_MACHINE
+  -D _USE_IOCTL=1
+  -D _USE_WRITE=1
+  -D _VOLUMES=1
+  -Wl,-u,_printf_float
+  -Wl,-u,_scanf_float
+lib_deps =
+  boards
+  bluetooth
+  grbl
+  keypad
+  laser
+  motors
+  trinamic
+  odometer
+  openpnp
+  fans
+  plugins
+  FatFs
+  sdcard
+  spindle
+  embroidery
+  Drivers/FATFS/App
+  Drivers/FATFS/Target
+  Middlewares/ST/STM32_USB_Device_Library/Core
+  Middlewares/ST/STM32_USB_Device_Library/Class
+  USB_DEVICE/App
+  USB_DEVICE/Target
+lib_extra_dirs =
+  .
+  boards
+  FatFs
+  Middlewares/ST/STM32_USB_Device_Library
+  USB_DEVICE
+
+[wiznet_networking]
+build_flags =
+  -I networking/wiznet
+  -I Middlewares/Third_Party/LwIP/src/include
+  -I Middlewares/Third_Party/LwIP/system
+  -I Middlewares/Third_Party/LwIP/src/include/netif
+  -I Middlewares/Third_Party/LwIP/src/include/lwip
+lib_deps =
+   networking
+   webui
+   Middlewares/Third_Party/LwIP
+lib_extra_dirs =
+
+; Shared by every generated variant; only the board and profile defines
+; differ between the [env:...] sections below
+[variant_common]
+build_flags =
+  ${{common.build_flags}}
+  ${{wiznet_networking.build_flags}}
+  -I ./3rdparty/grblhal-rgb-plugin
+  -I ./3rdparty/grblhal-keepout-plugin
+{sys_flags}
+lib_deps =
+  ${{common.lib_deps}}
+  eeprom
+  ${{wiznet_networking.lib_deps}}
+  ./3rdparty/grblhal-rgb-plugin
+  ./3rdparty/sienci-atci-plugin
+
+[env]
+platform = ststm32
+platform_packages = framework-stm32cubef4
+framework = stm32cube
+lib_archive = no
+lib_ldf_mode = off
+extra_scripts =
+    pre:extra_script.py
+    post:extra_script.py
+"""
+
+ENV_TEMPLATE = """
+; {display_name}
+[env:{env_name}]
+board = genericSTM32F412VG
+upload_protocol = dfu
+board_build.ldscript = STM32F412VGTX_FLASH.ld
+custom_prog_version = {prefix}
+custom_board_name = '{display_name}'
+build_flags =
+  ${{variant_common.build_flags}}
+  -D {board_define}
+{v_flags}
+
+lib_deps = ${{variant_common.lib_deps}}
+lib_extra_dirs = ${{common.lib_extra_dirs}}
+"""
+
+class _EnvNameTable(dict):
+    """str.translate table: keep [a-z0-9], drop parentheses, anything else -> '_'."""
+    def __missing__(self, codepoint):
+        return "_"
+
+_ENV_NAME_TABLE = _EnvNameTable({
+    **{ord(c): c for c in string.ascii_lowercase + string.digits},
+    ord("("): None,
+    ord(")"): None,
+})
+
+# Note: BOARD_LONGBOARD32_EXT removed from here; added dynamically per profile
+SYSTEM_BASELINE_FLAGS = [
+    "-D USE_HAL_DRIVER",
+    "-D STM32F412Vx",
+    "-D WEB_BUILD",
+    "-D USB_SERIAL_CDC=1",
+    "-D RTC_ENABLE=1",
+    "-D STEP_PULSE_LATENCY=1.3",
+    "-D ETH_TX_DESC_CNT=12",
+    "-D TCP_MSS=1460",
+    "-D TCP_SND_BUF=5840",
+    "-D LWIP_NUM_NETIF_CLIENT_DATA=2",
+    "-D LWIP_HTTPD_CUSTOM_FILES=0",
+    "-D MEM_SIZE=16384",
+    "-D LWIP_IGMP=1",
+    "-D LWIP_MDNS_RESPONDER=1",
+    "-D LWIP_NETIF_STATUS_CALLBACK=1",
+    "-D LWIP_HTTPD_DYNAMIC_HEADERS=1",
+    "-D LWIP_HTTPD_DYNAMIC_FILE_READ=1",
+    "-D LWIP_HTTPD_SUPPORT_V09=0",
+    "-D LWIP_HTTPD_SUPPORT_11_KEEPALIVE=1",
+    "-D LWIP_HTTPD_CGI_ADV=1",
+    "-D LWIP_HTTPD_SUPPORT_POST=1",
+    "-D LWIP_HTTPD_SUPPORT_WEBDAV=1",
+    "-D PROBE_ENABLE=1",
+    "-D MODBUS_ENABLE=3",
+    "-D MODBUS_BAUDRATE=3",
+    "-D EEPROM_ENABLE=128",
+    "-D N_EVENTS=4",
+    "-D _WIZCHIP_=5500",
+    "-D ETHERNET_ENABLE=1",
+    "-D SAFETY_DOOR_ENABLE=0",
+    "-D CONTROL_ENABLE=64",
+    "-D DEFAULT_STEP_PULSE_MICROSECONDS=5",
+    "-D DEFAULT_PARKING_ENABLE=0",
+    "-D NETWORK_IPMODE=0"
+]
+_SYS_FLAGS_STR = "\n".join("  " + f for f in SYSTEM_BASELINE_FLAGS)
+_BASELINE_FLAG_SET = frozenset(SYSTEM_BASELINE_FLAGS)
+
+@dataclass(slots=True)
+class Variant:
+    """One entry of a profile's "variants" list."""
+    name: str
+    default_symbols: dict
+    setting_defaults: dict
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["name"], data.get("default_symbols", {}), data.get("setting_defaults", {}))
+
+@functools.lru_cache(maxsize=None)
+def sanitize_env_name(name: str) -> str:
+    # Splitting on '_' and dropping empties collapses runs and strips the ends
+    return "_".join(filter(None, name.lower().translate(_ENV_NAME_TABLE).split("_")))
+
+def http_get(url, headers=None):
+    """GET url; returns (status, headers, decoded body).
+
+    Non-2xx answers, including a 304 to a conditional request, come back as
+    a status rather than an exception.
+    """
+    # Imported lazily: urllib.request pulls in http.client, ssl and the email
+    # parser, which a run served entirely from the profile cache never needs
+    import http.client
+    import urllib.error
+    import urllib.request
+    # urlopen follows redirects and honours HTTP(S)_PROXY
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "gzip", **(headers or {})})
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as resp:
+                status, resp_headers, body = resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            with e:
+                status, resp_headers, body = e.code, e.headers, e.read()
+        except (http.client.HTTPException, OSError):
+            if attempt == HTTP_RETRIES:
+                raise
+            time.sleep(HTTP_BACKOFF * 2 ** attempt)
+            continue
+        if resp_headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return status, resp_headers, body
+
+def _atomic_write(path, data):
+    # An interrupted run must never leave a truncated profile in the cache
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def _cached_get(url, load):
+    """Return load(body of url), revalidating an on-disk copy with the server.
+
+    load must raise for a body that is not usable; such a body is never
+    written to the cache, so a bad download can't be served from it later.
+    """
+    key = hashlib.sha1(url.encode()).hexdigest()
+    body_path = PROFILE_CACHE_DIR / f"{key}.json"
+    meta_path = PROFILE_CACHE_DIR / f"{key}.meta"
+
+    meta = {}
+    if body_path.exists() and meta_path.exists():
+        if time.time() - body_path.stat().st_mtime < PROFILE_CACHE_TTL:
+            return load(body_path.read_bytes())
+        meta = json.loads(meta_path.read_text())
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    import http.client
+    try:
+        status, resp_headers, body = http_get(url, headers)
+    except (http.client.HTTPException, OSError) as e:
+        if not meta:
+            raise
+        print(f"Network error ({e}), using cached copy of {url}")
+        return load(body_path.read_bytes())
+
+    if status == 304:
+        os.utime(body_path)  # restart the TTL window
+        return load(body_path.read_bytes())
+    if status != 200:
+        raise RuntimeError(f"HTTP {status} fetching {url}")
+
+    # e.g. a captive-portal page or a truncated upload raises here
+    result = load(body)
+    PROFILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _atomic_write(body_path, body)
+    _atomic_write(meta_path, json.dumps({
+        "url": url,
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+    }).encode())
+    return result
+
+class ProfileError(Exception):
+    """One or more profiles can't be turned into environments."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} profile error(s)")
+        self.errors = errors
+
+def validate_profile(profile):
+    """Raise ValueError unless profile has named variants to generate."""
+    variants = profile.get("variants") if isinstance(profile, dict) else None
+    if not variants:
+        raise ValueError("profile has no variants")
+    unnamed = [i for i, v in enumerate(variants)
+               if not isinstance(v, dict) or not isinstance(v.get("name"), str) or not v["name"]]
+    if unnamed:
+        raise ValueError(f"variants without a name at index {unnamed}")
+    # A name with no letters or digits would produce an empty [env:] section
+    unusable = [v["name"] for v in variants if not sanitize_env_name(v["name"])]
+    if unusable:
+        raise ValueError(f"variant names with no usable characters: {unusable}")
+
+def _load_profile(body):
+    # Both orjson and json parse bytes directly, no separate decode pass
+    profile = _loads(body)
+    validate_profile(profile)
+    return profile
+
+def download_profile(url):
+    print(f"Downloading profile: {url}")
+    return _cached_get(url, _load_profile)
+
+def _format_define(k, v):
+    key = "ATCI_ENABLE" if k == "SIENCI_ATCI" else k
+    if key.endswith("_LETTER") and isinstance(v, str):
+        char = v.replace("'", "").strip()
+        if len(char) == 1:
+            v = ord(char)
+    # Identity checks: cheaper than isinstance(v, bool) and never match 1/0
+    if v is False:
+        return None
+    flag = f"-D {key}" if v is True else f"-D {key}={v}"
+    # Already on every env's command line via [variant_common]
+    if flag in _BASELINE_FLAG_SET:
+        return None
+    return "  " + flag
+
+# Most defines repeat across variants; caching per (key, value) hands back the
+# same str object instead of formatting a fresh copy for every variant.
+# typed=True keeps True, 1 and 1.0 apart since they format differently.
+_format_define_cached = functools.lru_cache(maxsize=4096, typed=True)(_format_define)
+
+def _format_define_interned(k, v):
+    try:
+        return _format_define_cached(k, v)
+    except TypeError:  # unhashable value (e.g. a JSON list)
+        return _format_define(k, v)
+
+def _render_defines(items):
+    # Sorted so the generated ini diffs cleanly between runs
+    return "\n".join(filter(None, (_format_define_interned(k, v) for k, v in sorted(items))))
+
+@functools.lru_cache(maxsize=64)
+def _format_build_flags_cached(typed_items):
+    return _render_defines((k, v) for k, _, v in typed_items)
+
+def format_build_flags(defines):
+    # The value type is part of the cache key: True == 1 == 1.0 would
+    # otherwise share an entry but they format differently
+    try:
+        return _format_build_flags_cached(frozenset((k, type(v), v) for k, v in defines.items()))
+    except TypeError:  # unhashable value (e.g. a JSON list), format uncached
+        return _render_defines(defines.items())
+
+def generate_env(variant, env_name, global_defines, board_define, prefix):
+    # The name lands in a comment and a value line; a stray newline in a
+    # profile would otherwise start a new ini line
+    display_name = " ".join(variant.name.split())
+
+    # Settings override symbols, which override the machine-wide defines
+    merged_defines = ChainMap(variant.setting_defaults, variant.default_symbols, global_defines)
+
+    return ENV_TEMPLATE.format(
+        display_name=display_name,
+        env_name=env_name,
+        prefix=prefix,
+        board_define=board_define,
+        v_flags=format_build_flags(merged_defines),
+    )
+
+def download_profiles(profile_urls):
+    """Fetch profile_urls concurrently.
+
+    Returns ({url: profile} in list order, [error message, ...]).
+    """
+    with ThreadPoolExecutor(max_workers=min(4, len(profile_urls)) or 1) as pool:
+        futures = [pool.submit(download_profile, url) for url in profile_urls]
+
+    profiles = {}
+    errors = []
+    for url, future in zip(profile_urls, futures):
+        try:
+            profiles[url] = future.result()
+        except Exception as e:
+            errors.append(f"{url}: {e}")
+    return profiles, errors
+
+def _duplicate_env_errors(profiles):
+    # PlatformIO rejects a config with two [env:...] sections of the same name
+    seen = {}
+    errors = []
+    for source, profile in profiles.items():
+        for v in profile["variants"]:
+            env_name = sanitize_env_name(v["name"])
+            if env_name in seen:
+                errors.append(f"{source}: variant '{v['name']}' maps to env '{env_name}', already used by {seen[env_name]}")
+            else:
+                seen[env_name] = source
+    return errors
+
+def _inputs_digest(profiles):
+    h = hashlib.sha256()
+    h.update(json.dumps(profiles, sort_keys=True).encode())
+    h.update(Path(__file__).read_bytes())
+    return h.hexdigest()
+
+def write_ini(profiles, output_ini):
+    """Write one [env:...] per variant of each {source: profile} to output_ini."""
+    output_ini = Path(output_ini)
+
+    # Skip rendering when neither the profiles nor this generator changed since
+    # the last run, and output_ini still holds what that run wrote (a checkout
+    # or hand edit invalidates it); leaving the file untouched also keeps
+    # PlatformIO's build cache valid
+    digest = _inputs_digest(profiles)
+    hash_path = output_ini.with_name(output_ini.name + ".hash")
+    if output_ini.exists() and hash_path.exists():
+        stamp = f"{digest} {hashlib.sha256(output_ini.read_bytes()).hexdigest()}"
+        if hash_path.read_text() == stamp:
+            print(f"{output_ini} is up to date.")
+            return
+
+    all_env_names = []
+    env_specs = []
+
+    for profile in profiles.values():
+        machine = profile.get("machine", {})
+
+        # 1. Determine Board and File Prefix
+        board_define = machine.get("default_board", "BOARD_LONGBOARD32_EXT")
+        # If board is the EXT version, prefix SLB_EXT, otherwise just SLB
+        prefix = "SLB_EXT" if "EXT" in board_define else "SLB"
+
+        global_defines = {
+            **machine.get("default_symbols", {}),
+            **machine.get("setting_defaults", {})
+        }
+
+        variants = [Variant.from_json(v) for v in profile.get("variants", [])]
+        for variant in variants:
+            env_name = sanitize_env_name(variant.name)
+            all_env_names.append(env_name)
+            # 2. Pass board-specific info to the env generator
+            env_specs.append((variant, env_name, global_defines, board_define, prefix))
+
+    # Sections are rendered while streaming, so the full file is never held in
+    # memory; the 1 MiB buffer lets a typical ini go out in a single write().
+    # Rendering goes to a sibling temp file that only replaces the real one
+    # when its contents differ, so an identical result keeps the old mtime.
+    tmp_ini = output_ini.with_name(output_ini.name + ".tmp")
+    with tmp_ini.open("w", encoding="utf-8", newline="\n", buffering=1 << 20) as f:
+        f.write(STATIC_HEADER.format(
+            default_envs=", ".join(all_env_names),
+            sys_flags=_SYS_FLAGS_STR
+        ).strip() + "\n")
+        for spec in env_specs:
+            f.write(generate_env(*spec))
+    if output_ini.exists() and filecmp.cmp(tmp_ini, output_ini, shallow=False):
+        tmp_ini.unlink()
+        print(f"{output_ini} unchanged ({len(all_env_names)} environments).")
+    else:
+        os.replace(tmp_ini, output_ini)
+        print(f"Generated {output_ini} with {len(all_env_names)} environments.")
+    output_digest = hashlib.sha256(output_ini.read_bytes()).hexdigest()
+    _atomic_write(hash_path, f"{digest} {output_digest}".encode())
+
+def generate(profile_urls, output_ini):
+    """Download profile_urls and write one [env:...] per variant to output_ini.
+
+    Every profile is fetched and checked before anything is written; on any
+    problem a ProfileError listing all of them is raised and output_ini is
+    left untouched.
+    """
+    profiles, errors = download_profiles(profile_urls)
+    errors += _duplicate_env_errors(profiles)
+    if errors:
+        raise ProfileError(errors)
+    write_ini(profiles, output_ini)